@@ -5,18 +5,62 @@ analyzer.py - 使用 Gemini API 分析文章，同時選出「今日精選」與
   - response_mime_type="application/json" 強制 JSON 輸出，省去解析錯誤重試成本
 """
 
+import hashlib
 import json
 import logging
+import os
+import random
 import time
+from pathlib import Path
 
+import orjson
 from google import genai
 from google.genai import types
 
 logger = logging.getLogger(__name__)
 
+_ROOT = Path(__file__).parent.parent
+_CACHE_DIR = _ROOT / ".cache" / "gemini"
+
+# ── Retry 策略 ────────────────────────────────────────────────
+# 可重試的狀態碼：過載 / 限流 / 暫時性伺服器錯誤
+_RETRYABLE_CODES = (429, 500, 502, 503, 504)
+_RETRY_MAX_ATTEMPTS = 5
+_RETRY_BASE_DELAY   = 1.0   # 秒
+_RETRY_MAX_DELAY    = 60.0  # 秒
+
+
+def _is_retryable(exc: Exception) -> bool:
+    """判斷例外是否值得重試（限流、過載、timeout 等暫時性錯誤）"""
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    if code in _RETRYABLE_CODES:
+        return True
+    msg = str(exc).lower()
+    if "timeout" in msg or "deadline" in msg:
+        return True
+    return any(str(c) in msg for c in _RETRYABLE_CODES)
+
+
+def _retry_delay(exc: Exception, attempt: int) -> float:
+    """
+    計算重試等待秒數：
+    - 伺服器若給 Retry-After 就照辦
+    - 否則 exponential backoff + full jitter，避免同時重試造成尖峰
+    """
+    response = getattr(exc, "response", None)
+    headers  = getattr(response, "headers", None) or {}
+    retry_after = headers.get("Retry-After") or headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(float(retry_after), _RETRY_MAX_DELAY)
+        except (TypeError, ValueError):
+            pass
+    delay = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
 # Prompt 不需要再叮嚀「輸出合法 JSON、不要加 code block」
 # 因為 response_mime_type 會強制保證輸出格式
-PROMPT_TEMPLATE = """你是一位技術新聞編輯，需要為兩種不同讀者整理每日科技摘要。
+_EDITOR_PROMPT = """你是一位技術新聞編輯，需要為兩種不同讀者整理每日科技摘要。
 以下是過去 24 小時內從各科技媒體抓取的文章列表（JSON 格式）。
 注意：部分文章的 published_at 標記為 "unknown"，請根據內容判斷是否為近期事件。
 
@@ -78,20 +122,145 @@ PROMPT_TEMPLATE = """你是一位技術新聞編輯，需要為兩種不同讀
 {articles_json}
 """
 
+# Prompt 集中於單一 dict，依 settings["gemini"]["persona"] 選擇，
+# 避免多份 analyzer 複本只為了換 prompt 而分岔
+PROMPT_TEMPLATES = {
+    "editor": _EDITOR_PROMPT,
+}
+DEFAULT_PERSONA = "editor"
+
+
+# ── 回應快取 ──────────────────────────────────────────────────
+# 同一批文章（= 同一 prompt）重跑時直接回放上次結果，
+# 開發 / --dry-run 反覆迭代時省下全部 API 時間與 token 成本。
+# 只在 temperature == 0（輸出可重現）時啟用。
+
+def _cache_key(model: str, prompt: str) -> str:
+    return hashlib.sha256((model + "\0" + prompt).encode()).hexdigest()
+
+
+def _cache_get(key: str, ttl_hours: float) -> dict | None:
+    path = _CACHE_DIR / f"{key}.json"
+    try:
+        if not path.exists():
+            return None
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        if time.time() - entry.get("ts", 0) > ttl_hours * 3600:
+            return None
+        return entry.get("events")
+    except Exception as e:
+        logger.debug(f"快取讀取失敗 {path}: {e}")
+        return None
 
-def _build_articles_payload(articles: list[dict]) -> str:
-    """將文章精簡化後序列化，只保留分析所需欄位以減少 token"""
-    slim = [
+
+def _cache_put(key: str, events: dict, usage: dict) -> None:
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        path = _CACHE_DIR / f"{key}.json"
+        tmp  = path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"events": events, "usage": usage, "ts": time.time()},
+                       ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)  # 原子性寫入
+    except Exception as e:
+        logger.debug(f"快取寫入失敗: {e}")
+
+
+# 摘要總預算（字元）：約略對應模型的有效上下文 sweet spot，
+# 字元數在此作為 token 的便宜近似（精確 count_tokens 需多一次 API 呼叫）
+_SUMMARY_BUDGET_CHARS = 40_000
+_SUMMARY_MIN_CHARS    = 100    # 每篇至少保留的摘要長度
+_SUMMARY_MAX_CHARS    = 1_000  # 文章很少時也不必塞整篇
+
+
+def _build_articles_payload(articles: list[dict],
+                            budget_chars: int = _SUMMARY_BUDGET_CHARS) -> str:
+    """
+    將文章精簡化後序列化，只保留分析所需欄位以減少 token。
+    摘要長度依「總預算均分」截斷：文章多的日子每篇分到較短摘要，
+    讓 prompt 大小可預期、不會隨文章數線性暴漲；文章少時每篇可多留內文。
+    """
+    per_article = max(_SUMMARY_MIN_CHARS,
+                      min(_SUMMARY_MAX_CHARS, budget_chars // max(len(articles), 1)))
+    # orjson 為 C 實作，直接輸出 UTF-8（等同 ensure_ascii=False），
+    # 序列化比 stdlib json 快數倍
+    return orjson.dumps([
         {
             "title":        a.get("title", ""),
             "source":       a.get("source", ""),
             "url":          a.get("url", ""),
             "published_at": a.get("published_at", "unknown"),
-            "summary":      a.get("summary", "")[:400],
+            "summary":      a.get("summary", "")[:per_article],
         }
         for a in articles
-    ]
-    return json.dumps(slim, ensure_ascii=False)
+    ]).decode()
+
+
+def _prepare_request(articles: list[dict], settings: dict) -> dict:
+    """組出單次分析所需的 api_key / model / prompt / 輸出參數（sync 與 batch 共用）"""
+    gemini_cfg = settings.get("gemini", {})
+    persona    = gemini_cfg.get("persona", DEFAULT_PERSONA)
+    output_cfg = settings.get("output", {})
+    top_n      = output_cfg.get("top_events", 7)
+    beginner_n = output_cfg.get("top_beginner_events", 3)
+
+    template = PROMPT_TEMPLATES.get(persona)
+    if template is None:
+        logger.warning(f"未知 persona: {persona}，改用 {DEFAULT_PERSONA}")
+        template = PROMPT_TEMPLATES[DEFAULT_PERSONA]
+
+    return {
+        "api_key":     gemini_cfg.get("api_key", ""),
+        "model":       gemini_cfg.get("model", "gemini-2.0-flash"),
+        "top_n":       top_n,
+        "beginner_n":  beginner_n,
+        # temperature 預設 1.0；設定 cache_temperature_override（通常 0.0）
+        # 可讓輸出可重現，同時啟用回應快取
+        "temperature": gemini_cfg.get("cache_temperature_override", 1.0),
+        "prompt":      template.format(
+            articles_json=_build_articles_payload(
+                articles,
+                gemini_cfg.get("summary_budget_chars", _SUMMARY_BUDGET_CHARS),
+            ),
+            top_n=top_n,
+            beginner_n=beginner_n,
+        ),
+    }
+
+
+def _response_text(response) -> str:
+    """thinking model 的回應會帶有 thought_signature parts，只取 text parts 的串接結果"""
+    raw = ""
+    for part in response.candidates[0].content.parts:
+        if hasattr(part, "text") and part.text:
+            raw += part.text
+    return raw
+
+
+def _parse_result(raw: str, top_n: int, beginner_n: int) -> dict:
+    """解析並驗證 Gemini 回傳的 JSON，裁切到設定的則數上限"""
+    try:
+        result = json.loads(raw)
+        if not isinstance(result, dict):
+            raise ValueError(f"回應不是 JSON object，收到: {type(result)}")
+        if "main" not in result or "beginner" not in result:
+            raise ValueError(f"回應缺少 main 或 beginner 欄位，實際 keys: {list(result.keys())}")
+        if not isinstance(result["main"], list) or not isinstance(result["beginner"], list):
+            raise ValueError("main / beginner 必須是陣列")
+        result["main"]     = result["main"][:top_n]
+        result["beginner"] = result["beginner"][:beginner_n]
+        # 補齊欄位：下游（notifier）依賴這五個 key 一定存在，
+        # 缺漏一律補空字串，標題補 N/A
+        for event in result["main"] + result["beginner"]:
+            event.setdefault("title", "N/A")
+            for key in ("category", "summary", "url", "source"):
+                event.setdefault(key, "")
+    except (json.JSONDecodeError, ValueError) as e:
+        logger.error(f"JSON 解析失敗: {e}\n原始回應:\n{raw}")
+        raise
+    return result
 
 
 def analyze(articles: list[dict], settings: dict) -> dict:
@@ -102,27 +271,31 @@ def analyze(articles: list[dict], settings: dict) -> dict:
         logger.warning("沒有文章可分析")
         return {"main": [], "beginner": []}
 
-    gemini_cfg = settings.get("gemini", {})
-    api_key    = gemini_cfg.get("api_key", "")
-    model      = gemini_cfg.get("model", "gemini-2.0-flash")
-    output_cfg = settings.get("output", {})
-    top_n      = output_cfg.get("top_events", 7)
-    beginner_n = output_cfg.get("top_beginner_events", 3)
+    gemini_cfg  = settings.get("gemini", {})
+    req         = _prepare_request(articles, settings)
+    model       = req["model"]
+    prompt      = req["prompt"]
+    top_n       = req["top_n"]
+    beginner_n  = req["beginner_n"]
+    temperature = req["temperature"]
 
-    client = genai.Client(api_key=api_key)
+    use_cache = gemini_cfg.get("cache_enabled", True) and temperature == 0.0
+    ttl_hours = gemini_cfg.get("cache_ttl_hours", 24)
+    cache_key = _cache_key(model, prompt)
 
-    articles_json = _build_articles_payload(articles)
-    prompt        = PROMPT_TEMPLATE.format(
-        articles_json=articles_json,
-        top_n=top_n,
-        beginner_n=beginner_n,
-    )
+    if use_cache:
+        cached = _cache_get(cache_key, ttl_hours)
+        if cached is not None:
+            logger.info(f"Gemini 回應快取命中（key={cache_key[:12]}），跳過 API 呼叫")
+            return cached
+
+    client = genai.Client(api_key=req["api_key"])
 
     logger.info(f"呼叫 Gemini API（model={model}，文章數={len(articles)}）")
 
-    # 503 過載時自動 retry（preview model 常見）
+    # 暫時性錯誤（429/5xx/timeout）自動 retry：exponential backoff + jitter
     last_err = None
-    for attempt in range(1, 4):
+    for attempt in range(1, _RETRY_MAX_ATTEMPTS + 1):
         try:
             response = client.models.generate_content(
                 model=model,
@@ -130,16 +303,19 @@ def analyze(articles: list[dict], settings: dict) -> dict:
                 config=types.GenerateContentConfig(
                     response_mime_type="application/json",
                     max_output_tokens=8192,
-                    temperature=1.0,
+                    temperature=temperature,
                 ),
             )
             last_err = None
             break
         except Exception as e:
             last_err = e
-            if "503" in str(e) and attempt < 3:
-                wait = attempt * 15
-                logger.warning(f"Gemini 503 過載，{wait} 秒後重試（第 {attempt}/3 次）...")
+            if _is_retryable(e) and attempt < _RETRY_MAX_ATTEMPTS:
+                wait = _retry_delay(e, attempt)
+                logger.warning(
+                    f"Gemini 暫時性錯誤，{wait:.1f} 秒後重試"
+                    f"（第 {attempt}/{_RETRY_MAX_ATTEMPTS} 次）: {e}"
+                )
                 time.sleep(wait)
             else:
                 logger.error(f"Gemini API 呼叫失敗: {e}")
@@ -148,26 +324,7 @@ def analyze(articles: list[dict], settings: dict) -> dict:
     if last_err:
         raise last_err
 
-    # thinking model 的回應會帶有 thought_signature parts，
-    # 只取 text parts 的串接結果
-    raw = ""
-    for part in response.candidates[0].content.parts:
-        if hasattr(part, "text") and part.text:
-            raw += part.text
-
-    try:
-        result = json.loads(raw)
-        if not isinstance(result, dict):
-            raise ValueError(f"回應不是 JSON object，收到: {type(result)}")
-        if "main" not in result or "beginner" not in result:
-            raise ValueError(f"回應缺少 main 或 beginner 欄位，實際 keys: {list(result.keys())}")
-        if not isinstance(result["main"], list) or not isinstance(result["beginner"], list):
-            raise ValueError("main / beginner 必須是陣列")
-        result["main"]     = result["main"][:top_n]
-        result["beginner"] = result["beginner"][:beginner_n]
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"JSON 解析失敗: {e}\n原始回應:\n{raw}")
-        raise
+    result = _parse_result(_response_text(response), top_n, beginner_n)
 
     # 記錄 token 用量
     usage = response.usage_metadata
@@ -178,4 +335,134 @@ def analyze(articles: list[dict], settings: dict) -> dict:
     )
     logger.info(f"選出 main={len(result['main'])} 則、beginner={len(result['beginner'])} 則")
 
+    if use_cache:
+        _cache_put(cache_key, result, {
+            "prompt_token_count":     usage.prompt_token_count,
+            "candidates_token_count": usage.candidates_token_count,
+            "total_token_count":      usage.total_token_count,
+        })
+
     return result
+
+
+# ── Batch API（隔日收件模式）─────────────────────────────────
+# Gemini Batch API 在可接受 24 小時完成窗口時約有 50% 價格折扣，
+# 正好符合每日 digest 的節奏：第 N 天送出、第 N+1 天收件後推播。
+# 待收批次記錄在 .state/pending_batch.json。
+
+_STATE_DIR = _ROOT / ".state"
+_PENDING_BATCH_PATH = _STATE_DIR / "pending_batch.json"
+
+# 超過此時數仍未完成就視為過期，改走同步路徑
+_BATCH_DEADLINE_HOURS = 30
+
+
+def analyze_async_submit(articles: list[dict], settings: dict) -> str | None:
+    """
+    將分析請求送入 Gemini Batch API，回傳 batch job id。
+    結果由下一次執行的 analyze_async_collect() 收取。
+    """
+    if not articles:
+        logger.warning("沒有文章可送批次分析")
+        return None
+
+    req    = _prepare_request(articles, settings)
+    client = genai.Client(api_key=req["api_key"])
+
+    logger.info(f"送出 Gemini 批次任務（model={req['model']}，文章數={len(articles)}）")
+    batch = client.batches.create(
+        model=req["model"],
+        src=[{
+            "contents": [{"role": "user", "parts": [{"text": req["prompt"]}]}],
+            "config": {
+                "response_mime_type": "application/json",
+                "max_output_tokens":  8192,
+                "temperature":        req["temperature"],
+            },
+        }],
+    )
+
+    _STATE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _PENDING_BATCH_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps({
+        "batch_name":   batch.name,
+        "model":        req["model"],
+        "top_n":        req["top_n"],
+        "beginner_n":   req["beginner_n"],
+        "submitted_at": time.time(),
+    }), encoding="utf-8")
+    os.replace(tmp, _PENDING_BATCH_PATH)
+
+    logger.info(f"批次任務已送出: {batch.name}")
+    return batch.name
+
+
+def analyze_async_collect(settings: dict) -> tuple[str, dict | None]:
+    """
+    收取前一次送出的批次結果。回傳 (status, events)：
+      - ("none", None)    沒有待收批次
+      - ("pending", None) 批次仍在處理中（未逾期）
+      - ("stale", None)   批次失敗或逾期，呼叫端應改走同步路徑
+      - ("done", events)  成功，events 為 {"main": [...], "beginner": [...]}
+
+    "done" 不會銷帳批次記錄：要等推播成功後由呼叫端呼叫
+    analyze_async_ack()，否則推播失敗的重跑會收不回同一批結果。
+    """
+    if not _PENDING_BATCH_PATH.exists():
+        return "none", None
+
+    try:
+        pending = json.loads(_PENDING_BATCH_PATH.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning(f"待收批次記錄損毀，捨棄: {e}")
+        _PENDING_BATCH_PATH.unlink(missing_ok=True)
+        return "none", None
+
+    gemini_cfg = settings.get("gemini", {})
+    client     = genai.Client(api_key=gemini_cfg.get("api_key", ""))
+
+    try:
+        job = client.batches.get(name=pending["batch_name"])
+    except Exception as e:
+        logger.error(f"批次任務查詢失敗 {pending['batch_name']}: {e}")
+        _PENDING_BATCH_PATH.unlink(missing_ok=True)
+        return "stale", None
+
+    state = str(getattr(job, "state", ""))
+
+    if "SUCCEEDED" in state:
+        try:
+            response = job.dest.inlined_responses[0].response
+            result   = _parse_result(
+                _response_text(response),
+                pending.get("top_n", 7),
+                pending.get("beginner_n", 3),
+            )
+        except Exception as e:
+            logger.error(f"批次結果解析失敗: {e}")
+            _PENDING_BATCH_PATH.unlink(missing_ok=True)
+            return "stale", None
+        logger.info(f"批次任務完成: {pending['batch_name']}")
+        return "done", result
+
+    if any(s in state for s in ("FAILED", "CANCELLED", "EXPIRED")):
+        logger.error(f"批次任務未成功（{state}）: {pending['batch_name']}")
+        _PENDING_BATCH_PATH.unlink(missing_ok=True)
+        return "stale", None
+
+    deadline_hours = gemini_cfg.get("batch_deadline_hours", _BATCH_DEADLINE_HOURS)
+    age_hours = (time.time() - pending.get("submitted_at", 0)) / 3600
+    if age_hours > deadline_hours:
+        logger.warning(
+            f"批次任務逾期（{age_hours:.1f} 小時 > {deadline_hours}），改走同步路徑"
+        )
+        _PENDING_BATCH_PATH.unlink(missing_ok=True)
+        return "stale", None
+
+    logger.info(f"批次任務仍在處理中（{state}，已 {age_hours:.1f} 小時）")
+    return "pending", None
+
+
+def analyze_async_ack() -> None:
+    """收到的批次結果已成功推播，銷帳待收記錄（在此之前 collect 會重複回傳同一批）"""
+    _PENDING_BATCH_PATH.unlink(missing_ok=True)
@@ -11,20 +11,39 @@ crawler.py - 通用內容抓取器，支援三種模式：
   4. URL 中的日期樣式（/2025/02/21/、/20250221/ 等）
 """
 
+import calendar
+import email.utils
+import functools
+import gzip
+import hashlib
 import json
 import logging
+import os
 import re
+import threading
 import time as time_module
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+from pathlib import Path
 from typing import Optional
-from urllib.parse import urljoin, urlparse
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlsplit, urlunsplit
 
 import feedparser
 import requests
 import trafilatura
 from bs4 import BeautifulSoup
 from dateutil import parser as dateparser
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# selectolax（Modest engine）比 BS4+lxml 快 5-20 倍，
+# 用於熱路徑 HTML 解析；缺少時退回 BeautifulSoup
+try:
+    from selectolax.parser import HTMLParser as _SlxParser
+except ImportError:
+    _SlxParser = None
 
 logger = logging.getLogger(__name__)
 
@@ -46,23 +65,119 @@ _DATE_IN_URL = re.compile(
 
 # ── 工具函式 ──────────────────────────────────────────────────────────────────
 
-def _make_session(user_agent: str, timeout: int) -> requests.Session:
+# 單一回應最多讀取的 bytes 數（部分文章頁夾帶影音 / base64 資源，動輒數 MB）
+_DEFAULT_MAX_HTML_BYTES = 2_000_000
+
+
+def _make_session(user_agent: str, timeout: int,
+                  max_html_bytes: int = _DEFAULT_MAX_HTML_BYTES,
+                  http_cache: bool = True) -> requests.Session:
     s = requests.Session()
     s.headers.update({"User-Agent": user_agent})
-    s.request = lambda method, url, **kw: requests.Session.request(
-        s, method, url, timeout=kw.pop("timeout", timeout), **kw
+    # 加大連線池讓 keep-alive 跨多篇文章重用，省下重複 TCP/TLS 握手；
+    # 暫時性 5xx 交給 adapter 層 retry（指數 backoff）
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.5,
+                          status_forcelist=(500, 502, 503, 504)),
     )
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    # requests 沒有 session 層級的預設 timeout，用 partial 綁定
+    #（呼叫端仍可用 timeout= 覆寫）
+    s.request = functools.partial(s.request, timeout=timeout)
+    s._default_timeout = timeout
+    s._max_html_bytes = max_html_bytes
+    s._http_cache = http_cache
     return s
 
 
+def _clone_session(base: requests.Session) -> requests.Session:
+    """依既有 session 的 UA / timeout 建立新 session（供 worker thread 使用）"""
+    return _make_session(
+        base.headers.get("User-Agent", "TechCrawlerBot/1.0"),
+        getattr(base, "_default_timeout", 15),
+        getattr(base, "_max_html_bytes", _DEFAULT_MAX_HTML_BYTES),
+        getattr(base, "_http_cache", True),
+    )
+
+
+def _fetch_limited(session: requests.Session, url: str,
+                   allowed_types: tuple = ("html", "xml", "rss", "atom", "text"),
+                   cond_headers: Optional[dict] = None,
+                   ) -> tuple[Optional[bytes], str, dict]:
+    """
+    串流下載並截斷在 max_html_bytes 內，回傳 (body, encoding, meta)。
+    meta 含 status 與快取驗證用的 ETag / Last-Modified。
+    - Content-Type 明顯非文字類（圖片 / 影音等）時 body 為 None，
+      完全不讀 body，避免把大型二進位資源抓下來
+    - 帶 cond_headers 發出條件式請求時，304 回應的 body 為 None
+    HTTP 錯誤照常丟出例外，由呼叫端既有的 try/except 處理。
+    """
+    max_bytes = getattr(session, "_max_html_bytes", _DEFAULT_MAX_HTML_BYTES)
+    resp = session.get(url, stream=True, headers=cond_headers)
+    try:
+        if cond_headers and resp.status_code == 304:
+            return None, "", {"status": 304}
+        resp.raise_for_status()
+        ctype = resp.headers.get("Content-Type", "").lower()
+        if ctype and not any(t in ctype for t in allowed_types):
+            logger.debug(f"  跳過非文字內容 {url}（Content-Type: {ctype}）")
+            return None, "", {"status": resp.status_code}
+        body = resp.raw.read(max_bytes, decode_content=True)
+        return body, resp.encoding or "utf-8", {
+            "status":        resp.status_code,
+            "etag":          resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+    finally:
+        resp.close()
+
+
+# ── 同主機禮貌性限速 ─────────────────────────────────────────
+# 併發抓取時只有「同一主機」的請求需要間隔，不同主機可平行。
+_HOST_MIN_INTERVAL = 0.5  # 秒
+_host_lock = threading.Lock()
+_host_next_slot: dict[str, float] = {}
+
+
+def _polite_wait(url: str) -> None:
+    """確保對同一主機的請求至少間隔 _HOST_MIN_INTERVAL 秒"""
+    host = urlparse(url).netloc
+    with _host_lock:
+        now  = time_module.monotonic()
+        slot = max(now, _host_next_slot.get(host, 0.0))
+        _host_next_slot[host] = slot + _HOST_MIN_INTERVAL
+    if slot > now:
+        time_module.sleep(slot - now)
+
+
 def _to_utc(dt: datetime) -> datetime:
     if dt.tzinfo is None:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 
 
+@lru_cache(maxsize=4096)
 def _parse_date_str(s: str) -> Optional[datetime]:
-    """將任意日期字串解析為 UTC datetime"""
+    """
+    將任意日期字串解析為 UTC datetime。
+    先試 C 實作的快路徑（ISO-8601 / RFC-2822，涵蓋絕大多數 feed 與 sitemap），
+    失敗才退回 dateutil 的格式推斷（慢 1-2 個數量級）。
+    sitemap 的 lastmod 常大量重複，用 lru_cache 記憶結果。
+    """
+    if not s:
+        return None
+    s = s.strip()
+    try:
+        return _to_utc(datetime.fromisoformat(s.replace("Z", "+00:00")))
+    except ValueError:
+        pass
+    try:
+        return _to_utc(email.utils.parsedate_to_datetime(s))
+    except Exception:
+        pass
     try:
         return _to_utc(dateparser.parse(s))
     except Exception:
@@ -94,56 +209,194 @@ def _extract_date_from_html(html: str, url: str) -> Optional[datetime]:
     4. URL 中的日期樣式
     """
     try:
-        soup = BeautifulSoup(html, "lxml")
+        dt = (_date_from_html_slx(html) if _SlxParser is not None
+              else _date_from_html_bs4(html))
+        if dt:
+            return dt
+    except Exception:
+        pass
 
-        # 1. JSON-LD
-        for tag in soup.find_all("script", type="application/ld+json"):
-            try:
-                data = json.loads(tag.string or "")
-                if isinstance(data, list):
-                    data = data[0]
-                for field in ("datePublished", "dateModified", "dateCreated"):
-                    if field in data:
-                        dt = _parse_date_str(data[field])
-                        if dt:
-                            return dt
-            except Exception:
-                pass
+    # 4. URL fallback
+    return _date_from_url(url)
+
+
+# 依優先順序檢查的 meta 屬性
+_META_DATE_PROPS = ("article:published_time", "article:modified_time",
+                    "og:updated_time", "date", "pubdate", "DC.date")
+_JSONLD_DATE_FIELDS = ("datePublished", "dateModified", "dateCreated")
 
-        # 2. OpenGraph / meta tags
-        for prop in ("article:published_time", "article:modified_time",
-                     "og:updated_time", "date", "pubdate", "DC.date"):
-            tag = soup.find("meta", attrs={"property": prop}) or \
-                  soup.find("meta", attrs={"name": prop})
-            if tag and tag.get("content"):
-                dt = _parse_date_str(tag["content"])
-                if dt:
-                    return dt
 
-        # 3. <time> 標籤
-        for time_tag in soup.find_all("time"):
-            dt_attr = time_tag.get("datetime") or time_tag.get_text(strip=True)
-            if dt_attr:
-                dt = _parse_date_str(dt_attr)
+def _jsonld_date(raw: str) -> Optional[datetime]:
+    # 便宜的預檢：非 JSON 開頭就不必進 json.loads
+    raw = (raw or "").strip()
+    if not raw.startswith(("{", "[")):
+        return None
+    try:
+        data = json.loads(raw)
+        if isinstance(data, list):
+            data = data[0]
+        for field in _JSONLD_DATE_FIELDS:
+            if field in data:
+                dt = _parse_date_str(data[field])
                 if dt:
                     return dt
-
     except Exception:
         pass
+    return None
 
-    # 4. URL fallback
-    return _date_from_url(url)
+
+def _date_from_html_slx(html: str) -> Optional[datetime]:
+    tree = _SlxParser(html)
+
+    # 1. JSON-LD
+    for tag in tree.css('script[type="application/ld+json"]'):
+        dt = _jsonld_date(tag.text())
+        if dt:
+            return dt
+
+    # 2. OpenGraph / meta tags：單次走訪建表，再依優先順序查 dict
+    #   （取代每個屬性各掃一次整棵樹）
+    metas = {}
+    for node in tree.css("meta"):
+        attrs = node.attributes
+        prop = attrs.get("property") or attrs.get("name")
+        if prop and prop.lower() not in metas:
+            metas[prop.lower()] = attrs.get("content")
+    for prop in _META_DATE_PROPS:
+        content = metas.get(prop.lower())
+        if content:
+            dt = _parse_date_str(content)
+            if dt:
+                return dt
+
+    # 3. <time> 標籤
+    for time_tag in tree.css("time"):
+        dt_attr = time_tag.attributes.get("datetime") or time_tag.text(strip=True)
+        if dt_attr:
+            dt = _parse_date_str(dt_attr)
+            if dt:
+                return dt
+
+    return None
+
+
+def _date_from_html_bs4(html: str) -> Optional[datetime]:
+    soup = BeautifulSoup(html, "lxml")
+
+    # 1. JSON-LD
+    for tag in soup.find_all("script", type="application/ld+json"):
+        dt = _jsonld_date(tag.string or "")
+        if dt:
+            return dt
+
+    # 2. OpenGraph / meta tags：單次走訪建表，再依優先順序查 dict
+    metas = {}
+    for tag in soup.find_all("meta"):
+        prop = tag.get("property") or tag.get("name")
+        if prop and prop.lower() not in metas:
+            metas[prop.lower()] = tag.get("content")
+    for prop in _META_DATE_PROPS:
+        content = metas.get(prop.lower())
+        if content:
+            dt = _parse_date_str(content)
+            if dt:
+                return dt
+
+    # 3. <time> 標籤
+    for time_tag in soup.find_all("time"):
+        dt_attr = time_tag.get("datetime") or time_tag.get_text(strip=True)
+        if dt_attr:
+            dt = _parse_date_str(dt_attr)
+            if dt:
+                return dt
+
+    return None
 
 
 def _html_to_text(html: str, max_chars: int) -> str:
     """快速 HTML → 純文字，限制長度"""
     try:
+        if _SlxParser is not None:
+            body = _SlxParser(html).body
+            if body is not None:
+                return body.text(separator=" ", strip=True)[:max_chars]
+            return html[:max_chars]
         soup = BeautifulSoup(html, "lxml")
         return soup.get_text(" ", strip=True)[:max_chars]
     except Exception:
         return html[:max_chars]
 
 
+# 雜訊連結（導覽、標籤/分類頁、登入等），模組層級編譯一次
+_NOISE_PATTERNS = re.compile(
+    r"/(tag|tags|category|categories|author|page|search|login|signup"
+    r"|about|contact|privacy|terms)/|#|javascript:|mailto:",
+    re.I
+)
+
+# 啟發式選擇器：從語義性容器中找連結
+_HEURISTIC_SELECTORS = (
+    "article",
+    "main h2 a, main h3 a, main h4 a",
+    ".post-title a, .entry-title a, .article-title a, "
+    ".news-title a, .item-title a, h2 > a, h3 > a",
+)
+
+
+def _collect_hrefs_slx(html: str, selector: Optional[str]) -> list[str]:
+    tree = _SlxParser(html)
+
+    if selector:
+        nodes = tree.css(selector)
+    else:
+        nodes = []
+        for sel in _HEURISTIC_SELECTORS:
+            nodes = tree.css(sel)
+            if nodes:
+                break
+        # 若啟發式找不到，退而求其次抓全部 <a>
+        if not nodes:
+            nodes = tree.css("a[href]")
+
+    hrefs = []
+    for node in nodes:
+        if node.tag == "a":
+            href = node.attributes.get("href")
+        else:
+            sub = node.css_first("a[href]")
+            href = sub.attributes.get("href") if sub else None
+        if href:
+            hrefs.append(href)
+    return hrefs
+
+
+def _collect_hrefs_bs4(html: str, selector: Optional[str]) -> list[str]:
+    soup = BeautifulSoup(html, "lxml")
+
+    if selector:
+        anchors = soup.select(selector)
+    else:
+        anchors = (
+            soup.find_all("article") or
+            soup.select(_HEURISTIC_SELECTORS[1]) or
+            soup.select(_HEURISTIC_SELECTORS[2])
+        )
+        # 若啟發式找不到，退而求其次抓全部 <a>
+        if not anchors:
+            anchors = soup.find_all("a", href=True)
+
+    hrefs = []
+    for a in anchors:
+        if a.name == "a":
+            href = a.get("href")
+        else:
+            sub = a.find("a", href=True)
+            href = sub["href"] if sub else None
+        if href:
+            hrefs.append(str(href))
+    return hrefs
+
+
 def _extract_article_links(html: str, base_url: str, selector: Optional[str]) -> list[str]:
     """
     從列表頁找文章連結。
@@ -152,43 +405,18 @@ def _extract_article_links(html: str, base_url: str, selector: Optional[str]) ->
       排除導覽、footer、標籤/分類頁等雜訊連結
     """
     try:
-        soup = BeautifulSoup(html, "lxml")
-        base_domain = urlparse(base_url).netloc
-
-        if selector:
-            anchors = soup.select(selector)
-        else:
-            # 啟發式：從語義性容器中找連結
-            containers = (
-                soup.find_all("article") or
-                soup.select("main h2 a, main h3 a, main h4 a") or
-                soup.select(".post-title a, .entry-title a, .article-title a, "
-                            ".news-title a, .item-title a, h2 > a, h3 > a")
-            )
-            anchors = containers if selector else []
-            # 若啟發式找不到，退而求其次抓全部 <a>
-            if not anchors:
-                anchors = soup.find_all("a", href=True)
+        hrefs = (_collect_hrefs_slx(html, selector) if _SlxParser is not None
+                 else _collect_hrefs_bs4(html, selector))
 
         # 過濾並正規化 URL
-        noise_patterns = re.compile(
-            r"/(tag|tags|category|categories|author|page|search|login|signup"
-            r"|about|contact|privacy|terms)/|#|javascript:|mailto:",
-            re.I
-        )
         seen, links = set(), []
-        for a in anchors:
-            href = (a.get("href") if hasattr(a, "get") else
-                    a.get("href") if a.name == "a" else
-                    a.find("a", href=True) and a.find("a")["href"])
-            if not href:
-                continue
+        for href in hrefs:
             full = urljoin(base_url, str(href))
             parsed = urlparse(full)
             # 只接受 http(s)，同域或明確的文章路徑
             if parsed.scheme not in ("http", "https"):
                 continue
-            if noise_patterns.search(parsed.path):
+            if _NOISE_PATTERNS.search(parsed.path):
                 continue
             if full not in seen:
                 seen.add(full)
@@ -204,14 +432,17 @@ def _extract_article_links(html: str, base_url: str, selector: Optional[str]) ->
 # ── RSS ───────────────────────────────────────────────────────────────────────
 
 def _feedparser_entry_date(entry) -> Optional[datetime]:
+    # feedparser 已把時間正規化成 UTC struct_time，
+    # 用 calendar.timegm（UTC）轉 epoch —— time.mktime 會誤當本地時間
     for attr in ("published_parsed", "updated_parsed", "created_parsed"):
         val = getattr(entry, attr, None)
         if val:
             try:
-                ts = time_module.mktime(val)
+                ts = calendar.timegm(val)
                 return datetime.fromtimestamp(ts, tz=timezone.utc)
             except Exception:
                 pass
+    # 文字欄位只在 *_parsed 都缺時才解析
     for attr in ("published", "updated", "created"):
         val = getattr(entry, attr, None)
         if val:
@@ -225,9 +456,13 @@ def fetch_rss(source: dict, cutoff: datetime, max_per_source: int,
               max_chars: int, session: requests.Session) -> list[dict]:
     """抓取 RSS / Atom feed"""
     try:
-        resp = session.get(source["url"])
-        resp.raise_for_status()
-        feed = feedparser.parse(resp.content)
+        body, _, _ = _fetch_limited(session, source["url"])
+        if body is None:
+            return []
+        # 摘要之後會整段轉純文字，feedparser 的 HTML sanitize 與
+        # 相對 URI 解析是白做工，關掉可省下大半解析時間
+        feed = feedparser.parse(body, sanitize_html=False,
+                                resolve_relative_uris=False)
     except Exception as e:
         logger.warning(f"[{source['name']}] RSS 抓取失敗: {e}")
         return []
@@ -261,23 +496,53 @@ def fetch_rss(source: dict, cutoff: datetime, max_per_source: int,
 
 # ── Sitemap ───────────────────────────────────────────────────────────────────
 
+def _open_xml_stream(session: requests.Session, url: str):
+    """
+    開啟串流 XML 回應供 iterparse 使用；Content-Type 非文字類時回傳 None。
+    呼叫端負責 resp.close()。
+    """
+    resp = session.get(url, stream=True)
+    try:
+        resp.raise_for_status()
+        ctype = resp.headers.get("Content-Type", "").lower()
+        if ctype and not any(t in ctype for t in ("xml", "text", "html")):
+            logger.debug(f"  跳過非 XML 內容 {url}（Content-Type: {ctype}）")
+            resp.close()
+            return None
+        resp.raw.decode_content = True  # 讓 iterparse 直接讀解壓後的串流
+        return resp
+    except Exception:
+        resp.close()
+        raise
+
+
 def _resolve_sitemaps(root_url: str, session: requests.Session) -> list[str]:
     """
     從 sitemap index 展開到所有子 sitemap URL。
     若給定 URL 本身不是 index，直接回傳。
     """
     try:
-        resp = session.get(root_url)
-        resp.raise_for_status()
-        root = ET.fromstring(resp.content)
-        tag = root.tag.lower()
-        # sitemapindex 格式
-        if "sitemapindex" in tag:
-            return [
-                loc.text.strip()
-                for loc in root.iter(f"{{{NS['sm']}}}loc")
-                if loc.text
-            ]
+        resp = _open_xml_stream(session, root_url)
+        if resp is None:
+            return [root_url]
+        try:
+            sub_urls = []
+            is_index = False
+            # 串流解析：看到根元素就能判斷是否為 index，
+            # 不是的話立刻中止，不必讀完整份 sitemap
+            for event, elem in ET.iterparse(resp.raw, events=("start", "end")):
+                if event == "start":
+                    if not is_index:
+                        if "sitemapindex" not in elem.tag.lower():
+                            return [root_url]
+                        is_index = True
+                    continue
+                if elem.tag == f"{{{NS['sm']}}}loc" and elem.text:
+                    sub_urls.append(elem.text.strip())
+                elem.clear()
+            return sub_urls or [root_url]
+        finally:
+            resp.close()
     except Exception:
         pass
     return [root_url]
@@ -296,71 +561,141 @@ def fetch_sitemap(source: dict, cutoff: datetime, max_per_source: int,
         if len(articles) >= max_per_source:
             break
         try:
-            resp = session.get(sm_url)
-            resp.raise_for_status()
-            root = ET.fromstring(resp.content)
+            resp = _open_xml_stream(session, sm_url)
+            if resp is None:
+                continue
         except Exception as e:
-            logger.warning(f"[{source['name']}] Sitemap 解析失敗 {sm_url}: {e}")
+            logger.warning(f"[{source['name']}] Sitemap 抓取失敗 {sm_url}: {e}")
             continue
 
-        for url_el in root.iter(f"{{{NS['sm']}}}url"):
-            if len(articles) >= max_per_source:
-                break
+        # 串流解析：大型新聞 sitemap 可達數萬筆 URL，
+        # iterparse + clear() 維持常數記憶體，收滿即中止不再讀
+        try:
+            for event, url_el in ET.iterparse(resp.raw, events=("end",)):
+                if url_el.tag != f"{{{NS['sm']}}}url":
+                    continue
+
+                loc_el = url_el.find(f"{{{NS['sm']}}}loc")
+                if loc_el is None or not loc_el.text:
+                    url_el.clear()
+                    continue
+                article_url = loc_el.text.strip()
+
+                # 嘗試取日期：Google News > lastmod > 略過
+                pub_dt = None
+                news_date = url_el.find(f"{{{NS['news']}}}publication_date")
+                if news_date is not None and news_date.text:
+                    pub_dt = _parse_date_str(news_date.text)
+                if pub_dt is None:
+                    lastmod = url_el.find(f"{{{NS['sm']}}}lastmod")
+                    if lastmod is not None and lastmod.text:
+                        pub_dt = _parse_date_str(lastmod.text)
+                if pub_dt is None or pub_dt < cutoff:
+                    url_el.clear()
+                    continue
+
+                # 取標題：Google News sitemap 有 <news:title>
+                title = ""
+                news_title = url_el.find(f"{{{NS['news']}}}title")
+                if news_title is not None and news_title.text:
+                    title = news_title.text.strip()
+
+                articles.append({
+                    "title":        title or article_url,
+                    "url":          article_url,
+                    "published_at": pub_dt.isoformat(),
+                    "summary":      "",   # sitemap 通常無內文，讓 Claude 用標題判斷
+                    "source":       source["name"],
+                    "category":     source.get("category", "tech"),
+                })
+                url_el.clear()
+
+                if len(articles) >= max_per_source:
+                    break
+        except Exception as e:
+            logger.warning(f"[{source['name']}] Sitemap 解析失敗 {sm_url}: {e}")
+        finally:
+            resp.close()
 
-            loc_el = url_el.find(f"{{{NS['sm']}}}loc")
-            if loc_el is None or not loc_el.text:
-                continue
-            article_url = loc_el.text.strip()
+    logger.info(f"[{source['name']}] Sitemap: {len(articles)} 篇")
+    return articles
 
-            # 嘗試取日期：Google News > lastmod > 略過
-            pub_dt = None
-            news_date = url_el.find(f"{{{NS['news']}}}publication_date")
-            if news_date is not None and news_date.text:
-                pub_dt = _parse_date_str(news_date.text)
-            if pub_dt is None:
-                lastmod = url_el.find(f"{{{NS['sm']}}}lastmod")
-                if lastmod is not None and lastmod.text:
-                    pub_dt = _parse_date_str(lastmod.text)
-            if pub_dt is None or pub_dt < cutoff:
-                continue
 
-            # 取標題：Google News sitemap 有 <news:title>
-            title = ""
-            news_title = url_el.find(f"{{{NS['news']}}}title")
-            if news_title is not None and news_title.text:
-                title = news_title.text.strip()
+# ── Web（通用網頁爬取）────────────────────────────────────────────────────────
 
-            articles.append({
-                "title":        title or article_url,
-                "url":          article_url,
-                "published_at": pub_dt.isoformat(),
-                "summary":      "",   # sitemap 通常無內文，讓 Claude 用標題判斷
-                "source":       source["name"],
-                "category":     source.get("category", "tech"),
-            })
+# ── HTML 磁碟快取（條件式 GET）──────────────────────────────
+# 文章頁以 ETag / Last-Modified 做條件式請求：304 時直接回放磁碟上的
+# 壓縮副本，跨日共用來源與除錯重跑時完全不必重新下載。
 
-    logger.info(f"[{source['name']}] Sitemap: {len(articles)} 篇")
-    return articles
+_HTML_CACHE_DIR = Path(__file__).parent.parent / ".cache" / "html"
 
 
-# ── Web（通用網頁爬取）────────────────────────────────────────────────────────
+def _html_cache_paths(url: str) -> tuple[Path, Path]:
+    key = hashlib.sha1(url.encode()).hexdigest()
+    return _HTML_CACHE_DIR / f"{key}.json", _HTML_CACHE_DIR / f"{key}.html.gz"
 
-def _scrape_article(url: str, max_chars: int,
-                    session: requests.Session) -> Optional[dict]:
-    """
-    抓取單篇文章頁面，使用 trafilatura 提取正文 + metadata。
-    trafilatura 實作了 Mozilla Readability 演算法，能處理大多數文章網頁。
-    回傳 None 表示無法提取有效內容。
-    """
+
+def _html_cache_get_meta(url: str) -> Optional[dict]:
+    meta_path, _ = _html_cache_paths(url)
     try:
-        resp = session.get(url)
-        resp.raise_for_status()
-        html = resp.text
+        if meta_path.exists():
+            return json.loads(meta_path.read_text(encoding="utf-8"))
     except Exception as e:
-        logger.debug(f"  文章抓取失敗 {url}: {e}")
-        return None
+        logger.debug(f"  HTML 快取 meta 讀取失敗 {url}: {e}")
+    return None
+
 
-    # trafilatura 提取（JSON 格式取得 metadata）
+def _html_cache_get_body(url: str) -> Optional[str]:
+    _, body_path = _html_cache_paths(url)
+    try:
+        if body_path.exists():
+            return gzip.decompress(body_path.read_bytes()).decode("utf-8")
+    except Exception as e:
+        logger.debug(f"  HTML 快取讀取失敗 {url}: {e}")
+    return None
+
+
+def _html_cache_put(url: str, html: str, meta: dict) -> None:
+    # 沒有驗證欄位就無從發條件式請求，不值得佔磁碟
+    if not (meta.get("etag") or meta.get("last_modified")):
+        return
+    try:
+        _HTML_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = _html_cache_paths(url)
+        body_path.write_bytes(gzip.compress(html.encode("utf-8"), compresslevel=3))
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "etag":          meta.get("etag"),
+            "last_modified": meta.get("last_modified"),
+            "ts":            time_module.time(),
+        }), encoding="utf-8")
+        os.replace(tmp, meta_path)
+    except Exception as e:
+        logger.debug(f"  HTML 快取寫入失敗 {url}: {e}")
+
+
+# SPA / JS 渲染頁面的 <body> 在執行 JS 前幾乎是空的，
+# 先做便宜的文字量檢查，低於門檻就不必付 trafilatura 提取成本
+_MIN_BODY_TEXT_CHARS = 500
+
+# trafilatura 提取是純 Python CPU 工作且持有 GIL，會把 thread pool
+# 的併發抓取序列化；丟進 process pool 讓提取真正跨核心平行。
+# 延遲建立：沒有 web 類來源時完全不付 fork 成本。
+_EXTRACT_POOL: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _EXTRACT_POOL
+    if _EXTRACT_POOL is None:
+        with _extract_pool_lock:
+            if _EXTRACT_POOL is None:
+                _EXTRACT_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _EXTRACT_POOL
+
+
+def _extract_worker(html: str, url: str, max_chars: int) -> Optional[dict]:
+    """trafilatura 提取（JSON 格式取得 metadata）。top-level 函式以便 pickle 到子行程。"""
     raw_json = trafilatura.extract(
         html,
         url=url,
@@ -370,16 +705,76 @@ def _scrape_article(url: str, max_chars: int,
         no_fallback=False,
         favor_recall=True,          # 提高召回率，適合部落格頁面
     )
+    if not raw_json:
+        return None
+    try:
+        data = json.loads(raw_json)
+        return {
+            "title": data.get("title") or "",
+            "text":  (data.get("text") or "")[:max_chars],
+            "date":  data.get("date") or "",
+        }
+    except Exception:
+        return None
 
-    if raw_json:
-        try:
-            data = json.loads(raw_json)
-            title   = data.get("title") or ""
-            text    = (data.get("text") or "")[:max_chars]
-            date_str = data.get("date") or ""
-            pub_dt  = _parse_date_str(date_str) if date_str else None
-        except Exception:
-            title, text, pub_dt = "", "", None
+
+def _scrape_article(url: str, max_chars: int,
+                    session: requests.Session) -> Optional[dict]:
+    """
+    抓取單篇文章頁面，使用 trafilatura 提取正文 + metadata。
+    trafilatura 實作了 Mozilla Readability 演算法，能處理大多數文章網頁。
+    回傳 None 表示無法提取有效內容。
+    """
+    _polite_wait(url)
+    use_cache = getattr(session, "_http_cache", True)
+    try:
+        cond = None
+        if use_cache:
+            cached_meta = _html_cache_get_meta(url)
+            if cached_meta:
+                cond = {}
+                if cached_meta.get("etag"):
+                    cond["If-None-Match"] = cached_meta["etag"]
+                if cached_meta.get("last_modified"):
+                    cond["If-Modified-Since"] = cached_meta["last_modified"]
+
+        body, encoding, meta = _fetch_limited(session, url, cond_headers=cond or None)
+
+        html = None
+        if meta.get("status") == 304:
+            html = _html_cache_get_body(url)
+            if html is not None:
+                logger.debug(f"  304 快取命中 {url}")
+            else:
+                # 快取本體遺失，重新抓一次（不帶條件）
+                body, encoding, meta = _fetch_limited(session, url)
+
+        if html is None:
+            if body is None:
+                return None
+            html = body.decode(encoding, errors="replace")
+            if use_cache:
+                _html_cache_put(url, html, meta)
+    except Exception as e:
+        logger.debug(f"  文章抓取失敗 {url}: {e}")
+        return None
+
+    # JS 渲染頁面先行略過：正文反正是空的，提取只會白費 CPU
+    if len(_html_to_text(html, _MIN_BODY_TEXT_CHARS + 1)) < _MIN_BODY_TEXT_CHARS:
+        logger.debug(f"  [疑似 JS 渲染，略過] {url}")
+        return None
+
+    # 抓取（I/O）留在本 thread，只把 HTML 交給 process pool 提取（CPU）
+    try:
+        data = _get_extract_pool().submit(_extract_worker, html, url, max_chars).result()
+    except Exception as e:
+        logger.debug(f"  process pool 提取失敗，改行內執行 {url}: {e}")
+        data = _extract_worker(html, url, max_chars)
+
+    if data:
+        title  = data["title"]
+        text   = data["text"]
+        pub_dt = _parse_date_str(data["date"]) if data["date"] else None
     else:
         # trafilatura 提取失敗，退回到 BeautifulSoup
         title = ""
@@ -411,9 +806,10 @@ def fetch_web(source: dict, cutoff: datetime, max_per_source: int,
 
     # Step 1: 抓列表頁
     try:
-        resp = session.get(source["url"])
-        resp.raise_for_status()
-        listing_html = resp.text
+        body, encoding, _ = _fetch_limited(session, source["url"])
+        if body is None:
+            return []
+        listing_html = body.decode(encoding, errors="replace")
     except Exception as e:
         logger.warning(f"[{source['name']}] 列表頁抓取失敗: {e}")
         return []
@@ -421,49 +817,150 @@ def fetch_web(source: dict, cutoff: datetime, max_per_source: int,
     links = _extract_article_links(listing_html, source["url"], selector)
     logger.debug(f"[{source['name']}] 找到 {len(links)} 個候選連結")
 
-    # Step 2 & 3: 逐篇抓取並過濾
+    # Step 2 & 3: 併發抓取並過濾
+    # 同主機請求由 _polite_wait 限速，不同主機可平行；
+    # 每個 worker thread 用自己的 session
+    concurrency = source.get("concurrency", 4)
+    local = threading.local()
+
+    def _scrape_one(link: str) -> Optional[dict]:
+        s = getattr(local, "session", None)
+        if s is None:
+            s = local.session = _clone_session(session)
+        return _scrape_article(link, max_chars, s)
+
     articles = []
     checked  = 0
 
-    for link in links:
-        if len(articles) >= max_per_source:
-            break
-        if checked >= max_to_check:
-            break
-        checked += 1
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(_scrape_one, link)
+                   for link in links[:max_to_check]]
 
-        result = _scrape_article(link, max_chars, session)
-        if result is None:
-            continue
+        # 依提交順序消費結果，維持列表頁的排序
+        for link, future in zip(links, futures):
+            if len(articles) >= max_per_source:
+                future.cancel()
+                continue
+            checked += 1
 
-        pub_dt = result["pub_dt"]
+            result = future.result()
+            if result is None:
+                continue
 
-        # 若完全找不到日期，策略：保留文章讓 Claude 判斷（標記為 unknown）
-        if pub_dt is None:
-            logger.debug(f"  [日期不明] {result['title'] or link}")
-            pub_dt_str = "unknown"
-        elif pub_dt < cutoff:
-            continue
-        else:
-            pub_dt_str = pub_dt.isoformat()
+            pub_dt = result["pub_dt"]
 
-        title = result["title"] or link
-        articles.append({
-            "title":        title.strip(),
-            "url":          link,
-            "published_at": pub_dt_str,
-            "summary":      result["summary"],
-            "source":       source["name"],
-            "category":     source.get("category", "tech"),
-        })
+            # 若完全找不到日期，策略：保留文章讓 Claude 判斷（標記為 unknown）
+            if pub_dt is None:
+                logger.debug(f"  [日期不明] {result['title'] or link}")
+                pub_dt_str = "unknown"
+            elif pub_dt < cutoff:
+                continue
+            else:
+                pub_dt_str = pub_dt.isoformat()
 
-        # 禮貌性延遲，避免對目標網站造成壓力
-        time_module.sleep(0.5)
+            title = result["title"] or link
+            articles.append({
+                "title":        title.strip(),
+                "url":          link,
+                "published_at": pub_dt_str,
+                "summary":      result["summary"],
+                "source":       source["name"],
+                "category":     source.get("category", "tech"),
+            })
 
     logger.info(f"[{source['name']}] Web: 檢查 {checked} 篇，收錄 {len(articles)} 篇")
     return articles
 
 
+# ── URL 去重 ──────────────────────────────────────────────────────────────────
+# 同一篇報導常被多個來源聚合（HN、Reddit、原廠部落格），
+# 不去重的話會重複抓取、也重複吃掉 Gemini prompt token。
+
+_STATE_DIR = Path(__file__).parent.parent / ".state"
+_SEEN_URLS_PATH = _STATE_DIR / "seen_urls.json"
+
+
+def _normalize_url(url: str) -> str:
+    """正規化 URL 作為去重 key：小寫 scheme/host、去追蹤參數、去尾斜線與 fragment"""
+    try:
+        parts = urlsplit(url.strip())
+        query = urlencode([
+            (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+            if not k.lower().startswith("utm_") and k.lower() != "fbclid"
+        ])
+        path = parts.path.rstrip("/")
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(),
+                           path, query, ""))
+    except Exception:
+        return url
+
+
+def _load_seen_urls(ttl_days: float) -> dict:
+    """載入跨日已見 URL 表（{normalized_url: first_seen_ts}），順便清掉過期項目"""
+    try:
+        if not _SEEN_URLS_PATH.exists():
+            return {}
+        state  = json.loads(_SEEN_URLS_PATH.read_text(encoding="utf-8"))
+        cutoff = time_module.time() - ttl_days * 86400
+        return {u: ts for u, ts in state.items() if ts >= cutoff}
+    except Exception as e:
+        logger.debug(f"seen_urls 讀取失敗: {e}")
+        return {}
+
+
+def _save_seen_urls(state: dict) -> None:
+    try:
+        _STATE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = _SEEN_URLS_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, _SEEN_URLS_PATH)
+    except Exception as e:
+        logger.debug(f"seen_urls 寫入失敗: {e}")
+
+
+def _dedupe_articles(articles: list[dict], cfg: dict) -> list[dict]:
+    """
+    先做同次執行跨來源去重，再依 .state/seen_urls.json 濾掉近幾日已送過的文章。
+    只讀不寫：已見表要等推播成功後由呼叫端呼叫 mark_seen() 才更新，
+    否則分析 / 推播失敗的重跑會把當天文章全部濾掉。
+    """
+    seen_now, deduped = set(), []
+    for a in articles:
+        key = _normalize_url(a["url"])
+        if key in seen_now:
+            continue
+        seen_now.add(key)
+        deduped.append(a)
+    if len(deduped) < len(articles):
+        logger.info(f"跨來源去重：移除 {len(articles) - len(deduped)} 篇重複文章")
+
+    if not cfg.get("cross_run_dedup", True):
+        return deduped
+
+    ttl_days = cfg.get("seen_urls_ttl_days", 7)
+    seen_prev = _load_seen_urls(ttl_days)
+    fresh = [a for a in deduped if _normalize_url(a["url"]) not in seen_prev]
+    if len(fresh) < len(deduped):
+        logger.info(f"跨日去重：移除 {len(deduped) - len(fresh)} 篇近 {ttl_days} 日已見文章")
+
+    return fresh
+
+
+def mark_seen(articles: list[dict], settings: dict) -> None:
+    """
+    把本次成功送出的文章 URL 記入跨日已見表。
+    由 main.py 在推播成功（或批次送出）後呼叫；dry-run / crawl-only 不呼叫。
+    """
+    cfg = settings.get("crawler", {})
+    if not cfg.get("cross_run_dedup", True) or not articles:
+        return
+    state = _load_seen_urls(cfg.get("seen_urls_ttl_days", 7))
+    now   = time_module.time()
+    for a in articles:
+        state[_normalize_url(a["url"])] = now
+    _save_seen_urls(state)
+
+
 # ── 主入口 ────────────────────────────────────────────────────────────────────
 
 def crawl_all(sources_config: dict, settings: dict) -> list[dict]:
@@ -477,8 +974,8 @@ def crawl_all(sources_config: dict, settings: dict) -> list[dict]:
     timeout        = cfg.get("request_timeout", 15)
     user_agent     = cfg.get("user_agent", "TechCrawlerBot/1.0")
 
-    cutoff  = datetime.now(tz=timezone.utc) - timedelta(hours=lookback_hours)
-    session = _make_session(user_agent, timeout)
+    cutoff      = datetime.now(tz=timezone.utc) - timedelta(hours=lookback_hours)
+    max_workers = cfg.get("max_workers", 16)
 
     dispatch = {
         "rss":     fetch_rss,
@@ -486,30 +983,47 @@ def crawl_all(sources_config: dict, settings: dict) -> list[dict]:
         "web":     fetch_web,
     }
 
+    max_html_bytes = cfg.get("max_html_bytes", _DEFAULT_MAX_HTML_BYTES)
+    http_cache     = cfg.get("http_cache", True)
+
+    def _fetch_one(fetcher, source: dict) -> list[dict]:
+        # 每個 worker 用自己的 session（requests.Session 並非 thread-safe）
+        session = _make_session(user_agent, timeout, max_html_bytes, http_cache)
+        return fetcher(
+            source=source,
+            cutoff=cutoff,
+            max_per_source=max_per_source,
+            max_chars=max_chars,
+            session=session,
+        )
+
+    # 各來源皆為阻塞式 HTTP I/O，用 thread pool 併發抓取：
+    # 總耗時從「各來源延遲總和」降為「最慢來源的延遲」
     all_articles = []
-    for source in sources_config.get("sources", []):
-        # 跳過純文件欄位（_section, _doc 開頭的 key-only 物件）
-        if "url" not in source or "name" not in source:
-            continue
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for source in sources_config.get("sources", []):
+            # 跳過純文件欄位（_section, _doc 開頭的 key-only 物件）
+            if "url" not in source or "name" not in source:
+                continue
 
-        src_type = source.get("type", "rss")
-        fetcher  = dispatch.get(src_type)
+            src_type = source.get("type", "rss")
+            fetcher  = dispatch.get(src_type)
 
-        if fetcher is None:
-            logger.warning(f"[{source['name']}] 未知 type: {src_type}，跳過")
-            continue
+            if fetcher is None:
+                logger.warning(f"[{source['name']}] 未知 type: {src_type}，跳過")
+                continue
 
-        try:
-            articles = fetcher(
-                source=source,
-                cutoff=cutoff,
-                max_per_source=max_per_source,
-                max_chars=max_chars,
-                session=session,
-            )
-            all_articles.extend(articles)
-        except Exception as e:
-            logger.error(f"[{source['name']}] 爬取例外: {e}", exc_info=True)
+            futures[executor.submit(_fetch_one, fetcher, source)] = source
+
+        for future in as_completed(futures):
+            source = futures[future]
+            try:
+                all_articles.extend(future.result())
+            except Exception as e:
+                logger.error(f"[{source['name']}] 爬取例外: {e}", exc_info=True)
+
+    all_articles = _dedupe_articles(all_articles, cfg)
 
     logger.info(f"共抓取 {len(all_articles)} 篇文章（來自 {len(sources_config.get('sources', []))} 個來源）")
     return all_articles
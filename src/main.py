@@ -16,8 +16,9 @@ from dotenv import load_dotenv
 ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT / "src"))
 
-from crawler import crawl_all
-from analyzer import analyze
+from crawler import crawl_all, mark_seen
+from analyzer import (analyze, analyze_async_ack, analyze_async_collect,
+                      analyze_async_submit)
 from notifier import send_to_line
 
 # ── 日誌設定 ──────────────────────────────────────────────
@@ -89,6 +90,8 @@ def main():
                         help="跳過 LINE 傳送，僅印出分析結果（測試用）")
     parser.add_argument("--crawl-only", action="store_true",
                         help="只執行爬蟲，不呼叫 Claude（檢查來源用）")
+    parser.add_argument("--batch", action="store_true",
+                        help="使用 Gemini Batch API（約 5 折）：今日送出、明日收件後推播")
     args = parser.parse_args()
 
     logger.info("=== Tech Daily Digest 啟動 ===")
@@ -101,7 +104,9 @@ def main():
     logger.info("步驟 1/3：抓取文章...")
     articles = crawl_all(sources, settings)
 
-    if not articles:
+    # --batch 模式不能在這裡提前結束：就算今天沒抓到文章，
+    # 昨天送出的批次還是得收件推播，否則會放到過期
+    if not articles and not args.batch:
         logger.warning("沒有抓到任何文章，結束執行")
         sys.exit(0)
 
@@ -118,9 +123,40 @@ def main():
         sys.exit(0)
 
     # 3. Gemini 分析
+    # --batch 模式：先收前一天送出的批次；收到就推播並送出今日批次，
+    # 批次失敗 / 逾期則退回同步路徑
     logger.info("步驟 2/3：Gemini 分析中...")
+    batch_collected = False  # 本次 events 是否來自收件的批次（推播成功後才銷帳）
     try:
-        events = analyze(articles, settings)
+        if args.batch:
+            status, events = analyze_async_collect(settings)
+            if status == "pending":
+                logger.info("批次仍在處理中，本次不推播")
+                sys.exit(0)
+            if status == "none":
+                if not articles:
+                    logger.warning("沒有抓到任何文章，也沒有待收批次，結束執行")
+                    sys.exit(0)
+                if args.dry_run:
+                    logger.info(f"Dry-run：跳過批次送出（{len(articles)} 篇文章）")
+                    sys.exit(0)
+                analyze_async_submit(articles, settings)
+                # 已排入批次的文章視同消耗，明天不必重抓
+                mark_seen(articles, settings)
+                logger.info("批次已送出，明日收件後推播")
+                sys.exit(0)
+            if status == "stale":
+                if not articles:
+                    logger.warning("批次結果不可用且沒有新文章，結束執行")
+                    sys.exit(0)
+                logger.warning("批次結果不可用，改走同步分析")
+                events = analyze(articles, settings)
+            else:
+                # done：今日文章等推播成功後再排入明天的批次，
+                # 避免覆寫還沒銷帳的待收記錄
+                batch_collected = True
+        else:
+            events = analyze(articles, settings)
     except Exception as e:
         logger.error(f"分析失敗: {e}")
         sys.exit(1)
@@ -150,6 +186,8 @@ def main():
     print()
 
     if args.dry_run:
+        # 批次模式下 dry-run 純預覽：不送批次、不記已見、不銷帳收到的結果，
+        # 下一次正式執行仍會收到同一批
         logger.info("=== Dry-run 完成，跳過 LINE 傳送 ===")
         sys.exit(0)
 
@@ -158,6 +196,17 @@ def main():
     success = send_to_line(events, articles, settings)
 
     if success:
+        # 推播成功才更新狀態；失敗的話重跑還能重收批次、重抓同一批文章
+        if batch_collected:
+            analyze_async_ack()
+            if articles:
+                try:
+                    analyze_async_submit(articles, settings)
+                    mark_seen(articles, settings)
+                except Exception as e:
+                    logger.error(f"今日批次送出失敗，明日改走同步路徑: {e}")
+        else:
+            mark_seen(articles, settings)
         logger.info("=== 執行完成 ✓ ===")
     else:
         logger.error("LINE 傳送失敗")
@@ -5,80 +5,152 @@ notifier.py - 透過 LINE Messaging API 傳送摘要
 
 import requests
 import logging
+import time
+import uuid
 from collections import Counter
-from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 logger = logging.getLogger(__name__)
 
 LINE_PUSH_URL = "https://api.line.me/v2/bot/message/push"
 
+# 訊息分隔線（常數，不必每次呼叫重新相乘配置）
+_DIV = "─" * 22
+
+# 事件編號前綴；超出預建範圍才退回執行期格式化
+_ICONS = ("1.", "2.", "3.", "4.", "5.", "6.", "7.", "8.", "9.", "10.")
+
+# 事件欄位一次取出（analyzer._parse_result 保證五個 key 都存在）；
+# itemgetter 是 C 實作，比連續五次 .get 少掉 Python 層方法呼叫
+_FIELDS = itemgetter("category", "title", "summary", "url", "source")
+
+# 模組層級 session：HTTP keep-alive 讓同一行程的後續推播重用 TCP/TLS
+# 連線（TLS 握手佔單次推播延遲的大宗）；暫時性錯誤交給 adapter 層 retry
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=("POST",)),
+))
+
+
+# 時間戳只精確到分鐘，同一分鐘內的重複呼叫（重試、批次）直接重用
+_ts_cache: tuple[int, str] = (-1, "")
+
+
+def _utc_minute_stamp() -> str:
+    global _ts_cache
+    minute = int(time.time()) // 60
+    if minute != _ts_cache[0]:
+        _ts_cache = (minute, time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime()))
+    return _ts_cache[1]
 
-def _append_section(lines: list[str], heading: str, items: list[dict]) -> None:
-    """把一個區塊（標題 + 事件列表）追加到訊息行陣列。items 為空時整段略過。"""
+
+@lru_cache(maxsize=4)
+def _auth_headers(token: str) -> dict:
+    """token 在行程存活期間不變，headers dict 組一次就好"""
+    return {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+
+
+def _append_section(push, heading: str, items: list[dict]) -> bool:
+    """
+    把一個區塊（標題 + 事件列表）經 push 追加到訊息。items 為空時整段略過。
+    回傳 False 表示長度預算已用盡，呼叫端應停止繼續組裝。
+    """
     if not items:
-        return
-    lines.append(f"\n◆ {heading}")
+        return True
+    if not push(f"\n◆ {heading}"):
+        return False
     for i, event in enumerate(items):
-        category = event.get("category", "")
-        title    = event.get("title", "N/A")
-        summary  = event.get("summary", "")
-        url      = event.get("url", "")
-        source   = event.get("source", "")
-
-        lines.append(f"\n{i+1}. [{category}] {title}")
-        if summary:
-            lines.append(f"{summary}")
-        if url:
-            lines.append(f"→ {url}")
-        if source:
-            lines.append(f"via {source}")
-
-
-def _format_message(events: dict, articles: list[dict]) -> str:
+        category, title, summary, url, source = _FIELDS(event)
+
+        icon = _ICONS[i] if i < len(_ICONS) else f"{i+1}."
+        # 每則事件組成單一字串再 append，少掉多次 list append 與中繼小字串；
+        # 無插值需求的片段用純串接，省掉 BUILD_STRING 開銷
+        if not push(
+            f"\n{icon} [{category}] {title}"
+            + ("\n" + summary if summary else "")
+            + ("\n→ " + url if url else "")
+            + ("\nvia " + source if source else "")
+        ):
+            return False
+    return True
+
+
+def _format_message(events: dict, article_sources: list[str],
+                    max_chars: int = 4999) -> str:
     """
-    將兩區塊事件（main + beginner）格式化成 LINE 純文字訊息
-    LINE 單則訊息上限 5000 字元
+    將兩區塊事件（main + beginner）格式化成 LINE 純文字訊息。
+    article_sources 是抓取文章的來源名稱欄（統計 footer 只用這一欄，
+    傳扁平 list 就不必逐篇 dict 查找）。
+    LINE 單則訊息上限 5000 字元：組裝時即時追蹤長度，
+    預算用盡就停止並補上截斷標記，不必先建完整訊息再切。
     """
-    tw_time = datetime.now(tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-    lines = [
-        f"Tech Daily Digest  {tw_time}",
-        "─" * 22,
-    ]
+    tw_time = _utc_minute_stamp()
+
+    lines: list[str] = []
+    running   = 0
+    truncated = False
+    budget    = max_chars - 3  # 預留截斷標記 "..." 的空間
+
+    def _push(text: str) -> bool:
+        nonlocal running, truncated
+        add = len(text) + (1 if lines else 0)  # join 時的換行
+        if running + add > budget:
+            truncated = True
+            return False
+        lines.append(text)
+        running += add
+        return True
+
+    _push(f"Tech Daily Digest  {tw_time}")
+    _push(_DIV)
 
     main_items     = events.get("main", []) or []
     beginner_items = events.get("beginner", []) or []
 
-    _append_section(lines, "今日精選", main_items)
+    ok = _append_section(_push, "今日精選", main_items)
 
-    if beginner_items:
-        lines.append("\n" + "─" * 22)
-        _append_section(lines, "新手友善（0-4 年工程師）", beginner_items)
+    if ok and beginner_items:
+        ok = (_push("\n" + _DIV) and
+              _append_section(_push, "新手友善（0-4 年工程師）", beginner_items))
 
     # ── 統計 footer ──────────────────────────────────────
-    lines.append("\n" + "─" * 22)
-
-    source_counts = Counter(a["source"] for a in articles)
-    total = sum(source_counts.values())
-    active_sources = sorted(
-        [(src, cnt) for src, cnt in source_counts.items() if cnt > 0],
-        key=lambda x: -x[1]
-    )
-
-    lines.append(f"本次分析：{len(source_counts)} 個來源 / {total} 篇文章")
-    # 列出有抓到文章的來源
-    src_parts = [f"{src}({cnt})" for src, cnt in active_sources]
-    if src_parts:
-        # 分行避免太長
-        chunk, row = [], []
-        for part in src_parts:
-            row.append(part)
-            if len("  ".join(row)) > 36:
-                chunk.append("  ".join(row[:-1]))
-                row = [part]
-        if row:
-            chunk.append("  ".join(row))
-        lines.extend(chunk)
-
+    if ok and _push("\n" + _DIV):
+        # Counter 不會存 0，most_common() 直接給出排序結果，
+        # 不必再過濾 + 手動 sorted
+        source_counts  = Counter(article_sources)
+        total          = source_counts.total()
+        active_sources = source_counts.most_common()
+
+        if _push(f"本次分析：{len(source_counts)} 個來源 / {total} 篇文章"):
+            # 列出有抓到文章的來源，分行避免太長；
+            # 行寬用累計長度追蹤，不必每圈重新 join 整行（O(n²) → O(n)）
+            row, row_len = [], 0
+            for part in (f"{src}({cnt})" for src, cnt in active_sources):
+                row.append(part)
+                row_len += len(part) + (2 if len(row) > 1 else 0)
+                if row_len > 36:
+                    if not _push("  ".join(row[:-1])):
+                        row = []
+                        break
+                    row, row_len = [part], len(part)
+            if row:
+                _push("  ".join(row))
+
+    if truncated:
+        lines.append("...")
     return "\n".join(lines)
 
 
@@ -96,24 +168,24 @@ def send_to_line(events: dict, articles: list[dict], settings: dict) -> bool:
         logger.error("LINE 設定不完整：缺少 channel_access_token 或 target_id")
         return False
 
-    message_text = _format_message(events, articles)
+    # 長度上限在 _format_message 內即時處理，不必事後再切；
+    # 統計只需要 source 一欄，先抽成扁平 list 再傳入
+    message_text = _format_message(events, [a["source"] for a in articles])
     logger.info(f"LINE 訊息長度: {len(message_text)} 字元")
 
-    # LINE 單則訊息上限 5000 字元
-    if len(message_text) > 4999:
-        message_text = message_text[:4996] + "..."
-
     payload = {
         "to": target_id,
         "messages": [{"type": "text", "text": message_text}],
     }
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json",
-    }
+    # X-Line-Retry-Key：同一則訊息的 adapter 層重試共用同一組 key，
+    # LINE 端據此去重，5xx/逾時後的重送不會造成重複推播
+    headers = {**_auth_headers(token), "X-Line-Retry-Key": str(uuid.uuid4())}
+
+    # orjson 直接輸出 UTF-8 bytes，比 requests 內部的 stdlib json.dumps 快約 5 倍
+    body = orjson.dumps(payload)
 
     try:
-        resp = requests.post(LINE_PUSH_URL, json=payload, headers=headers, timeout=10)
+        resp = _SESSION.post(LINE_PUSH_URL, data=body, headers=headers, timeout=10)
         resp.raise_for_status()
         logger.info("LINE 訊息傳送成功")
         return True
@@ -123,3 +195,17 @@ def send_to_line(events: dict, articles: list[dict], settings: dict) -> bool:
     except requests.RequestException as e:
         logger.error(f"LINE 傳送失敗: {e}")
         return False
+
+
+# 背景送出用的共用 executor；推播不需要同步等結果時，
+# 可把 10 秒的網路逾時移出呼叫端的關鍵路徑
+_EXEC = ThreadPoolExecutor(max_workers=2, thread_name_prefix="line-notify")
+
+
+def send_to_line_async(events: dict, articles: list[dict],
+                       settings: dict) -> "Future[bool]":
+    """
+    非同步版 send_to_line：送出後立即回傳 Future，
+    呼叫端可繼續做其他事，需要確認結果時再 .result()
+    """
+    return _EXEC.submit(send_to_line, events, articles, settings)